@@ -1,10 +1,25 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response
+from flask.json.provider import DefaultJSONProvider
+from markupsafe import Markup
+from jinja2 import FileSystemBytecodeCache
+from jinja2.utils import htmlsafe_json_dumps
 import os
 import sys
+import gzip
+import hashlib
+import time
+import logging
+import threading
+from functools import lru_cache
 from datetime import datetime, timedelta
-import sqlite3
+import numpy as np
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load Env
 load_dotenv()
 
@@ -15,28 +30,184 @@ import config
 
 # Ensure directories exist (Critical for Gunicorn/Render)
 config.ensure_directories()
+config.setup_logging()
+logger = logging.getLogger(__name__)
 
-try:
-    from src.database.queries import TransportDB
-    from src.models.engine import ENGINE
-except ImportError:
-    # Fallback to local import if running from root
-    from src.database.queries import TransportDB
-    from src.models.engine import ENGINE
+from src.database.queries import TransportDB
+from src.models.engine import ENGINE, format_hm, njit, service_clock
+from src.web.assets import build_stylesheet
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (sorted keys, numpy scalars supported)"""
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 app.secret_key = os.getenv("SECRET_KEY", "hyder-transit-secret-key")
 
 # Initialize DB with explicit check
 DB = TransportDB()
 if not os.path.exists(config.DB_PATH):
-    print(f"CRITICAL WARNING: Database file not found at {config.DB_PATH}")
-
-def get_now_ist():
-    return config.get_now_ist()
+    logger.critical("Database file not found at %s", config.DB_PATH)
+
+def get_now_ist(timestamp=None):
+    return config.get_now_ist(timestamp)
+
+# Stylesheet is minified once per worker; the content hash in its URL makes it immutable
+STYLESHEET = build_stylesheet(config.CSS_DIR / "style.css")
+
+def _stylesheet():
+    # Debug rebuilds on every use so stylesheet edits show up without a restart
+    return build_stylesheet(config.CSS_DIR / "style.css") if app.debug else STYLESHEET
+
+@app.context_processor
+def _inject_stylesheet():
+    sheet = _stylesheet()
+    return {"css_version": sheet["version"], "critical_css": Markup(sheet["critical"])}
+
+# Compiled template bytecode is kept on disk (keyed by source checksum), so restarts skip parse/compile too
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+
+# Compile every template at import (shared by preloaded Gunicorn workers); requests then only render
+_TEMPLATES = {name: app.jinja_env.get_template(name) for name in app.jinja_env.list_templates(extensions=["html"])}
+
+def _render_page(name, **context):
+    """render_template with the import-time Template object, skipping the per-call loader lookup.
+       With auto-reload on (debug) the name is passed instead so template edits are still picked up.
+    """
+    return render_template(name if app.jinja_env.auto_reload else _TEMPLATES[name], **context)
+
+@app.route('/assets/css/style.css')
+def stylesheet():
+    sheet = _stylesheet()
+    variants = sheet["variants"]
+    encoding = request.accept_encodings.best_match([e for e in ("br", "gzip") if e in variants], default="identity")
+    resp = make_response(variants[encoding])
+    resp.mimetype = "text/css"
+    if encoding != "identity":
+        resp.headers['Content-Encoding'] = encoding
+    resp.vary.add('Accept-Encoding')
+    resp.headers['Cache-Control'] = "public, max-age=31536000, immutable"
+    # Each encoding is its own representation, so it needs its own validator
+    resp.set_etag(f"{sheet['version']}-{encoding}")
+    return resp.make_conditional(request)
+
+# Route topology is static until the DB is rebuilt, so lookups are memoized per worker and keyed
+# on DB.data_version() so a re-ingest from another process invalidates them
+@lru_cache(maxsize=2)
+def _cached_locations(version):
+    return tuple(DB.get_locations())
+
+@lru_cache(maxsize=2)
+def _location_snippets(version):
+    """Location list rendered once: JSON for base.html's autocomplete, <option> markup for map.html"""
+    locs = list(_cached_locations(version))
+    options = Markup("").join(Markup('<option value="{0}">{0}</option>').format(loc) for loc in locs)
+    return htmlsafe_json_dumps(locs, dumps=app.json.dumps), options
+
+@app.context_processor
+def _inject_locations():
+    # Single source for every page's location pickers, so templates never loop over the list
+    locations_json, location_options = _location_snippets(DB.data_version())
+    return {"locations_json": locations_json, "location_options": location_options}
+
+@lru_cache(maxsize=2048)
+def _cached_route(from_loc, to_loc, mode, version):
+    return DB.get_route_details(from_loc, to_loc, mode)
+
+@lru_cache(maxsize=2)
+def _route_matrix(version):
+    """/api/route's distance and stops for every route in the DB, keyed [from][to][mode] for map.html"""
+    matrix = {}
+    for from_loc, to_loc, mode in DB.get_route_keys():
+        details = _cached_route(from_loc, to_loc, mode, version)
+        if details:
+            matrix.setdefault(from_loc, {}).setdefault(to_loc, {})[mode] = {
+                "distance_km": details["distance_km"], "stops": details["stops"]}
+    return matrix
+
+def _cacheable_json(payload, max_age, volatile=()):
+    """JSON response with Cache-Control; GETs also get an ETag so revalidations can 304.
+       `volatile` keys (e.g. a wall-clock stamp) are left out of the ETag so they do not defeat it.
+    """
+    resp = make_response(jsonify(payload))
+    resp.headers['Cache-Control'] = f"public, max-age={max_age}, stale-while-revalidate={max_age}"
+    if request.method != 'GET':
+        # POST responses are never revalidated, so an ETag would only cost a hash
+        return resp
+    if volatile:
+        stable = {k: v for k, v in payload.items() if k not in volatile}
+        resp.set_etag(hashlib.sha1(app.json.dumps(stable).encode()).hexdigest())
+    else:
+        resp.add_etag()
+    return resp.make_conditional(request)
+
+# Rendered pages carry per-request state (live banner, active nav link, search results), so they are compressed on the way out
+HTML_GZIP_MIN_BYTES = 1024
+
+def _compress_html(body):
+    """gzip bytes for an HTML body, or None when it is too small to be worth it"""
+    return gzip.compress(body, compresslevel=6) if len(body) >= HTML_GZIP_MIN_BYTES else None
+
+def _gzip_response(resp, compressed):
+    resp.set_data(compressed)
+    resp.headers['Content-Encoding'] = 'gzip'
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+@app.after_request
+def _gzip_html(resp):
+    # Responses that arrive already encoded (the cached dashboard) are passed through untouched
+    if (resp.mimetype != "text/html" or resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed
+            or 'Content-Encoding' in resp.headers or 'gzip' not in request.accept_encodings):
+        return resp
+    compressed = _compress_html(resp.get_data())
+    return _gzip_response(resp, compressed) if compressed else resp
+
+# Legacy/client spellings -> canonical DB location names
+_NAME_MAP = {"Lb Nagar": "L.B. Nagar", "Hi-Tech City": "Hitech City"}
+_KNOWN_LOCATIONS = frozenset(config.HYDERABAD_LOCATIONS)
+
+def _canonicalize(name):
+    """Normalize a user-supplied location name, skipping .title() for canonical input"""
+    name = name.strip()
+    if name in _KNOWN_LOCATIONS:
+        return name
+    name = name.title()
+    return _NAME_MAP.get(name, name)
+
+# Live context is shared by all requests within the same minute
+_LIVE_ENV_CACHE = {"ts": 0, "val": None}
+_LIVE_ENV_LOCK = threading.Lock()
 
 def get_live_env():
-    """Shared helper to get rich system context for any page"""
+    """Shared helper to get rich system context for any page (cached per minute)"""
+    bucket = int(time.time()) // 60
+    if bucket == _LIVE_ENV_CACHE["ts"] and _LIVE_ENV_CACHE["val"] is not None:
+        return _LIVE_ENV_CACHE["val"]
+    with _LIVE_ENV_LOCK:
+        # Double-check: another thread may have refreshed while we waited
+        if bucket == _LIVE_ENV_CACHE["ts"] and _LIVE_ENV_CACHE["val"] is not None:
+            return _LIVE_ENV_CACHE["val"]
+        val = _build_live_env()
+        _LIVE_ENV_CACHE["val"] = val
+        _LIVE_ENV_CACHE["ts"] = bucket
+        return val
+
+def get_live_env_lite(max_age_min=10):
+    """Banner-only pages: reuse the last context if it is recent enough instead of refreshing"""
+    val = _LIVE_ENV_CACHE["val"]
+    if val is not None and int(time.time()) // 60 - _LIVE_ENV_CACHE["ts"] <= max_age_min:
+        return val
+    return get_live_env()
+
+def _build_live_env():
     weather = ENGINE.get_realtime_weather()
     now = get_now_ist()
     hour = now.hour
@@ -63,60 +234,67 @@ def get_live_env():
         "event_flag": event_flag
     }
 
+# The dashboard only varies with the per-minute live context and the date, so one render (and one
+# gzip pass) serves the minute: (key, html, gzip bytes or None)
+_INDEX_PAGE = (None, None, None)
+
 # Route: Home Page
 @app.route('/')
 def index():
+    global _INDEX_PAGE
     live_env = get_live_env()
-    return render_template('index.html', live_env=live_env, today_date=get_now_ist().strftime("%Y-%m-%d"))
+    today = get_now_ist().strftime("%Y-%m-%d")
+    key = (_LIVE_ENV_CACHE["ts"], today)
+    if _INDEX_PAGE[0] != key or app.debug:
+        html = _render_page('index.html', live_env=live_env, today_date=today)
+        _INDEX_PAGE = (key, html, _compress_html(html.encode()))
+    _, html, compressed = _INDEX_PAGE
+    if compressed and 'gzip' in request.accept_encodings:
+        return _gzip_response(make_response(html), compressed)
+    return html
 
 
 # Route: Manual Prediction Page
 @app.route('/predict')
 def prediction_page():
-    return render_template('prediction.html', 
+    return _render_page('prediction.html', 
                           today_date=get_now_ist().strftime("%Y-%m-%d"),
-                          live_env=get_live_env())
+                          live_env=get_live_env_lite())
 
 # API: Search (Used by Prediction Page) & Form Post
 @app.route('/search', methods=['POST'])
 def search():
-    from_loc = request.form.get('from_location', '').strip().title()
-    to_loc = request.form.get('to_location', '').strip().title()
+    from_loc = _canonicalize(request.form.get('from_location', ''))
+    to_loc = _canonicalize(request.form.get('to_location', ''))
     date_str = request.form.get('travel_date', '')
     if not date_str:
         date_str = get_now_ist().strftime("%Y-%m-%d")
     t_type = request.form.get('transport_type', 'Bus')
-    
-    # Name Mapping
-    mapping = {"Lb Nagar": "L.B. Nagar", "Hi-Tech City": "Hitech City"}
-    from_loc = mapping.get(from_loc, from_loc)
-    to_loc = mapping.get(to_loc, to_loc)
 
     # Date Logic
     # Pass requested date directly; DB now handles fallback to templates
     mapped_date = date_str
 
     # 1. Get Schedules
-    schedules_df = DB.get_schedules_by_route(from_loc, to_loc, t_type, mapped_date)
+    rows = DB.get_schedules_by_route(from_loc, to_loc, t_type, mapped_date)
     
     live_env = get_live_env()
 
 
     # Detect if fallback occurred (mixed modes)
-    if not schedules_df.empty:
-        unique_modes = schedules_df['Transport_Type'].unique()
-        if t_type not in unique_modes and len(unique_modes) > 0:
+    if rows:
+        unique_modes = {r['Transport_Type'] for r in rows}
+        if t_type not in unique_modes:
             flash(f"Requested mode '{t_type}' unavailable. Showing available alternatives.", "warning")
             # t_type = "Any"  # Keep user selection for UI consistency
 
-    if schedules_df.empty:
-        return render_template('index.html', error=f"No services found for this specific route on {date_str}. Try popular routes like Secunderabad to Miyapur.", live_env=live_env, travel_date=date_str)
+    if not rows:
+        return _render_page('index.html', error=f"No services found for this specific route on {date_str}. Try popular routes like Secunderabad to Miyapur.", live_env=live_env, travel_date=date_str)
 
     # 2. Process Batch using Engine (Enforces Distribution)
-    schedules_raw = schedules_df.to_dict('records')
-    schedules = ENGINE.process_batch(schedules_raw, date_str)
+    schedules = ENGINE.process_batch(rows, date_str)
 
-    return render_template('index.html', 
+    return _render_page('index.html', 
                           schedules=schedules, 
                           from_loc=from_loc, 
                           to_loc=to_loc,
@@ -128,60 +306,99 @@ def search():
 def api_search():
     # Logic for Prediction Page JSON API
     data = request.json
-    from_loc = data.get('from', '').strip().title()
-    to_loc = data.get('to', '').strip().title()
+    from_loc = _canonicalize(data.get('from', ''))
+    to_loc = _canonicalize(data.get('to', ''))
     date_str = data.get('date', '')
     if not date_str:
         date_str = get_now_ist().strftime("%Y-%m-%d")
     t_type = data.get('type', 'Bus')
-    
-    mapping = {"Lb Nagar": "L.B. Nagar", "Hi-Tech City": "Hitech City"}
-    from_loc = mapping.get(from_loc, from_loc)
-    to_loc = mapping.get(to_loc, to_loc)
 
     mapped_date = date_str
 
-    schedules_df = DB.get_schedules_by_route(from_loc, to_loc, t_type, mapped_date)
+    rows = DB.get_schedules_by_route(from_loc, to_loc, t_type, mapped_date)
     
-    if schedules_df.empty:
+    if not rows:
         return {"error": "No services found"}, 404
         
-    schedules_raw = schedules_df.to_dict('records')
     # Use same batch process
-    schedules = ENGINE.process_batch(schedules_raw, date_str)
+    schedules = ENGINE.process_batch(rows, date_str)
     
     # Extract one sample for the "Representative Insight" box
     # We pick the one with highest delay to show 'worst case' or average?
     # Let's pick the first one.
     sample = schedules[0]['prediction']
     
-    return {
+    return _cacheable_json({
         "schedules": schedules,
         "representative_insight": sample
-    }
+    }, max_age=60)
+
+# Only the columns the tracking view and ENGINE.predict_one actually read
+_TRACKING_QUERY = (
+    "SELECT id, Date, Route_ID, Service_ID, Transport_Type, From_Location, To_Location, "
+    "Stops, Scheduled_Departure, Scheduled_Arrival, Distance_KM, Dep_Hour, Dep_Minute, Duration_Min "
+    "FROM schedules WHERE id = ?"
+)
+
+# Per-stop status codes produced by _compute_stop_times
+STOP_UPCOMING, STOP_DEPARTED, STOP_AT_STATION = 0, 1, 2
+
+@njit(cache=True)
+def _compute_stop_times(n, dur, delay, now_offset_sec, is_today):
+    """Scheduled/estimated minute offsets from departure and a status code for each stop"""
+    sched = np.empty(n, dtype=np.int64)
+    est = np.empty(n, dtype=np.int64)
+    status = np.zeros(n, dtype=np.int8)
+    denom = max(1, n - 1)
+    step_sched = dur / denom
+    step_delay = delay / denom
+    for i in range(n):
+        # Precise offset distribution based on Trip Duration
+        sched[i] = int(i * step_sched)
+        est[i] = sched[i] + int(i * step_delay)
+        if is_today:
+            est_sec = est[i] * 60
+            if now_offset_sec > est_sec + 120:
+                status[i] = STOP_DEPARTED
+            elif now_offset_sec >= est_sec - 120:
+                status[i] = STOP_AT_STATION
+    return sched, est, status
+
+@lru_cache(maxsize=4096)
+def _cached_prediction(service_id, travel_date, hour_bucket, version):
+    """Service row, its pre-split stop list and ML prediction, reused by tracking polls within the same hour.
+       Keyed on DB.data_version() too: a rebuild renumbers ids, so an old row must not outlive it.
+    """
+    service = DB.get_conn().execute(_TRACKING_QUERY, (service_id,)).fetchone()
+    if not service:
+        return None
+    svc_dict = dict(service)
+    raw_stops = tuple(svc_dict.get('Stops', '').split('|'))
+    return svc_dict, raw_stops, ENGINE.predict_one(svc_dict, travel_date)
 
-def _get_tracking_data(service_id, travel_date):
+def _get_tracking_data(service_id, travel_date, now=None):
     try:
-        conn = sqlite3.connect(config.DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM schedules WHERE id = ?", (service_id,))
-        service = cursor.fetchone()
-        conn.close()
+        cached = _cached_prediction(service_id, travel_date, int(time.time()) // 3600, DB.data_version())
     except Exception as e:
-        print(f"Error connecting to database: {e}")
+        logger.error("Error connecting to database: %s", e)
         return None
 
-    if not service: return None
+    if not cached: return None
 
-    svc_dict = dict(service)
-    pred = ENGINE.predict_one(svc_dict, travel_date)
+    # Single clock read per request keeps every comparison below consistent
+    now = now or get_now_ist()
+    svc_dict, raw_stops, pred = cached
     
-    sch_dep = svc_dict['Scheduled_Departure']
+    # The travel date is user input; the departure clock and run time come precomputed from ingest
     try:
-        base_dt = datetime.strptime(f"{travel_date} {sch_dep}", "%Y-%m-%d %H:%M")
-    except:
-        base_dt = get_now_ist()
+        travel_day = datetime.strptime(travel_date, "%Y-%m-%d")
+    except ValueError:
+        travel_day = None
+    try:
+        dep_min, run_min = service_clock(svc_dict)
+        base_dt = travel_day + timedelta(minutes=dep_min)
+    except (TypeError, ValueError):
+        base_dt, run_min = now, None
         
     start_var = 0 if pred['predicted_delay'] == 0 else 2
     actual_start = base_dt + timedelta(minutes=start_var)
@@ -190,54 +407,52 @@ def _get_tracking_data(service_id, travel_date):
     scheduled_arrival_str = pred.get('scheduled_arrival', '10:00')
     predicted_arrival_str = pred.get('predicted_arrival', '10:00')
     
-    try:
-        arr_dt = datetime.strptime(f"{travel_date} {scheduled_arrival_str}", "%Y-%m-%d %H:%M")
-        dur = int((arr_dt - base_dt).total_seconds() / 60)
-        if dur <= 0: raise ValueError
-    except:
-        dur = 30 # absolute fallback
+    if run_min and run_min > 0:
+        dur = run_min
+    else:
+        # No usable scheduled run: fall back to the engine's arrival estimate
+        try:
+            hh, mm = (scheduled_arrival_str or '').split(':')
+            arr_dt = travel_day + timedelta(minutes=int(hh) * 60 + int(mm))
+            dur = int((arr_dt - base_dt).total_seconds() / 60)
+            if dur <= 0: raise ValueError
+        except (TypeError, ValueError):
+            dur = 30 # absolute fallback
     
     # Stops logic
     stops = []
-    raw_stops = svc_dict.get('Stops', '').split('|')
-    now = get_now_ist()
-    try:
-        chk_dt = datetime.strptime(travel_date, "%Y-%m-%d").date()
-    except:
-        chk_dt = now.date()
+    today = now.date()
+    chk_dt = travel_day.date() if travel_day else today
         
-    is_today = (chk_dt == now.date())
-    is_past = (chk_dt < now.date())
-    is_future = (chk_dt > now.date())
-    found_current = False
+    is_today = (chk_dt == today)
+    is_past = (chk_dt < today)
+    is_future = (chk_dt > today)
+    n_stops = len(raw_stops)
+    now_offset_sec = (now - base_dt).total_seconds()
+    sched_offsets, est_offsets, status_codes = _compute_stop_times(
+        n_stops, dur, pred['predicted_delay'], now_offset_sec, is_today)
     
+    base_min = base_dt.hour * 60 + base_dt.minute
     for i, s_name in enumerate(raw_stops):
-        # Precise offset distribution based on Trip Duration
-        sched_offset = int(i * (dur / max(1, len(raw_stops)-1)))
-        sched_time = base_dt + timedelta(minutes=sched_offset)
-        delay_at_stop = int(i * (pred['predicted_delay'] / max(1, len(raw_stops)-1)))
-        est_time = base_dt + timedelta(minutes=sched_offset + delay_at_stop)
-        
         status = "Upcoming"
         is_passed = False
         is_current = False
         
         if is_today:
-            if now > est_time + timedelta(minutes=2):
+            if status_codes[i] == STOP_DEPARTED:
                 status = "Departed"
                 is_passed = True
-            elif now >= est_time - timedelta(minutes=2):
+            elif status_codes[i] == STOP_AT_STATION:
                 status = "At Station"
                 is_current = True
-                found_current = True
         elif is_past:
-             status = "Departed" if i < len(raw_stops)-1 else "Reached"
+             status = "Departed" if i < n_stops-1 else "Reached"
              is_passed = True
         
         stops.append({
             "name": s_name,
-            "est": est_time.strftime("%H:%M"),
-            "sched": sched_time.strftime("%H:%M"),
+            "est": format_hm(base_min + int(est_offsets[i])),
+            "sched": format_hm(base_min + int(sched_offsets[i])),
             "is_passed": is_passed,
             "is_current": is_current,
             "status": status
@@ -260,69 +475,113 @@ def _get_tracking_data(service_id, travel_date):
         "now_time": now.strftime('%H:%M:%S')
     }
 
+# Stop statuses are recomputed at most this often per (service, date); reloads and polls in between share them
+TRACK_CACHE_SECONDS = 30
+
+@lru_cache(maxsize=1024)
+def _cached_tracking(service_id, travel_date, bucket, version):
+    # Statuses and now_time both come from the bucket's start, so a response never mixes two clock readings
+    return _get_tracking_data(service_id, travel_date, now=get_now_ist(bucket * TRACK_CACHE_SECONDS))
+
+def _tracking_snapshot(service_id, travel_date):
+    """Cached tracking payload for the current TRACK_CACHE_SECONDS bucket"""
+    return _cached_tracking(service_id, travel_date, int(time.time()) // TRACK_CACHE_SECONDS, DB.data_version())
+
+_MODE_ICONS = {"Bus": "bus", "Metro": "train-front"}
+
+def _tracker_view(info, insights):
+    """Flat values for schedule.html, resolved once here instead of per template lookup"""
+    mode = info['Transport_Type']
+    weather = insights['weather']
+    return {
+        "sid": info['Service_ID'],
+        "from": info['From_Location'],
+        "to": info['To_Location'],
+        "mode_class": mode.lower(),
+        "mode_icon": _MODE_ICONS.get(mode, "train"),
+        "mode_label": mode.upper(),
+        "risk_class": "risk-" + insights['risk_level'].lower(),
+        "delay": insights['predicted_delay'],
+        "status_text": insights['status_text'],
+        "reach_time": info['Reach_Time'],
+        "sched_reach": info['Sched_Reach'],
+        "reason": insights['reason'],
+        "recommendation": insights['recommendation'],
+        "weather_desc": weather['description'],
+        "weather_temp": weather['temp'],
+        "traffic": insights['traffic'],
+        "traffic_class": "text-danger" if insights['traffic'] in ("High", "Very High") else "",
+        "load": insights['load'],
+    }
+
 @app.route('/track/<int:service_id>')
 def track(service_id):
+    now = get_now_ist()
     travel_date = request.args.get('date', '')
     if not travel_date:
-        travel_date = get_now_ist().strftime("%Y-%m-%d")
-    data = _get_tracking_data(service_id, travel_date)
+        travel_date = now.strftime("%Y-%m-%d")
+    data = _tracking_snapshot(service_id, travel_date)
     if not data:
         return redirect(url_for('index'))
-    data['live_env'] = get_live_env()
-    return render_template('schedule.html', **data)
+    return _render_page('schedule.html', ctx=_tracker_view(data['info'], data['insights']),
+                           stops=data['stops'], now_time=data['now_time'], live_env=get_live_env())
 
 @app.route('/api/track/<int:service_id>')
 def api_track(service_id):
+    now = get_now_ist()
     travel_date = request.args.get('date', '')
     if not travel_date:
-        travel_date = get_now_ist().strftime("%Y-%m-%d")
-    data = _get_tracking_data(service_id, travel_date)
+        travel_date = now.strftime("%Y-%m-%d")
+    data = _tracking_snapshot(service_id, travel_date)
     if not data:
         return {"error": "Not Found"}, 404
-    return data
+    # Stop statuses tick per minute, so only short-lived reuse is safe
+    return _cacheable_json(data, max_age=15, volatile=('now_time',))
 
 
 @app.route('/map')
 def live_map():
-    live_env = get_live_env()
-    # Fetch dynamic locations from database to resolve NameError
-    locations = DB.get_locations()
-    return render_template('map.html', live_env=live_env, locations=locations)
+    live_env = get_live_env_lite()
+    return _render_page('map.html', live_env=live_env, route_matrix=_route_matrix(DB.data_version()))
 
 @app.route('/api/route', methods=['POST'])
 def api_route_details():
     data = request.json
-    from_loc = data.get('from', '').strip()
-    to_loc = data.get('to', '').strip()
+    # Handles title-casing and mappings if client sends old versions
+    from_loc = _canonicalize(data.get('from', ''))
+    to_loc = _canonicalize(data.get('to', ''))
     mode = data.get('mode')
     
-    # Handle mappings if client sends old versions
-    mapping = {"Lb Nagar": "L.B. Nagar", "Hi-Tech City": "Hitech City"}
-    from_loc = mapping.get(from_loc, from_loc)
-    to_loc = mapping.get(to_loc, to_loc)
-    
-    details = DB.get_route_details(from_loc, to_loc, mode)
-    if not details:
-        # Try title case just in case
-        details = DB.get_route_details(from_loc.title(), to_loc.title(), mode)
-        
+    details = _cached_route(from_loc, to_loc, mode, DB.data_version())
     if not details:
         return {"error": "Route not found in database intelligence."}, 404
     
-    return details
+    # Route metadata is near-static
+    return _cacheable_json(details, max_age=3600)
 
 
 
 
+@lru_cache(maxsize=2)
+def _hourly_delay_bars(version):
+    """/analytics bar chart: average delay per departure hour, as a percentage of the worst hour.
+       Keyed on DB.data_version() so a re-ingest (which rewrites schedules_by_hour) refreshes it.
+    """
+    rows = DB.get_hourly_delays()
+    worst = max((r["avg_delay"] for r in rows), default=0) or 1
+    return [{"label": f"{r['hour']:02d}h", "pct": round(100 * r["avg_delay"] / worst), "avg": round(r["avg_delay"], 1)}
+            for r in rows]
+
 @app.route('/analytics')
 def analytics():
-    live_env = get_live_env()
-    return render_template('analytics.html', live_env=live_env)
+    live_env = get_live_env_lite()
+    return _render_page('analytics.html', live_env=live_env, hourly_delays=_hourly_delay_bars(DB.data_version()))
 
 
 
 if __name__ == '__main__':
     from src.database.db_config import init_db
-    config.ensure_directories()
+    # Directories were already ensured at import time
     init_db()
-    app.run(debug=True, port=8000)
+    # Development server only; production runs through wsgi.py under Gunicorn
+    app.run(host=config.FLASK_HOST, port=config.FLASK_PORT, debug=config.FLASK_DEBUG)
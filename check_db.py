@@ -21,26 +21,25 @@ try:
     print(f"Tables: {tables}")
     
     if ('schedules',) in tables:
-        # Count rows
-        count = cursor.execute("SELECT COUNT(1) FROM schedules").fetchone()[0]
+        # Single pass over the table for all summary figures
+        count, min_date, max_date, route_count, bus_count = cursor.execute("""
+            SELECT COUNT(1), MIN(date), MAX(date),
+                   SUM(CASE WHEN from_location='Secunderabad' AND to_location='Miyapur' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN from_location='Secunderabad' AND to_location='Miyapur' AND transport_type='Bus' THEN 1 ELSE 0 END)
+            FROM schedules
+        """).fetchone()
         print(f"Total Rows in 'schedules': {count}")
         
         if count > 0:
             # Check date range
-            min_date = cursor.execute("SELECT MIN(date) FROM schedules").fetchone()[0]
-            max_date = cursor.execute("SELECT MAX(date) FROM schedules").fetchone()[0]
             print(f"Date Range: {min_date} to {max_date}")
             
             # Check specific route
             print("\nChecking Secunderabad -> Miyapur:")
-            cursor.execute("SELECT COUNT(1) FROM schedules WHERE from_location='Secunderabad' AND to_location='Miyapur'")
-            route_count = cursor.fetchone()[0]
             print(f"Direct Route Count (Any Date): {route_count}")
             
             if route_count > 0:
                  # Check 'Bus' specifically
-                cursor.execute("SELECT COUNT(1) FROM schedules WHERE from_location='Secunderabad' AND to_location='Miyapur' AND transport_type='Bus'")
-                bus_count = cursor.fetchone()[0]
                 print(f"Bus Route Count: {bus_count}")
         else:
              print("⚠️ Table 'schedules' is empty.")
@@ -6,6 +6,9 @@ All other modules should import from this file instead of using hardcoded paths.
 """
 
 import os
+import logging
+from logging.handlers import WatchedFileHandler
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -52,6 +55,8 @@ CSS_DIR = STATIC_DIR / "css"
 RAW_DATA_FILE = RAW_DATA_DIR / "hyderabad_transport_raw.csv"
 CLEANED_DATA_FILE = PROCESSED_DATA_DIR / "hyderabad_transport_cleaned.csv"
 FEATURES_DATA_FILE = PROCESSED_DATA_DIR / "hyderabad_transport_features.csv"
+# Columnar copy of the feature set, written alongside the CSV when PyArrow is available
+FEATURES_PARQUET_FILE = FEATURES_DATA_FILE.with_suffix(".parquet")
 
 # Database
 DB_PATH = DATA_DIR / "transport.db"
@@ -200,12 +205,16 @@ SPEED_ESTIMATES = {
 # UTILITY FUNCTIONS
 # ============================================================================
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-def get_now_ist():
-    """Helper to get current time in IST (UTC+5:30) for consistency across deployments"""
-    import datetime as dt
-    return dt.datetime.utcnow() + dt.timedelta(hours=5, minutes=30)
+_IST = timezone(timedelta(hours=5, minutes=30))
+
+def get_now_ist(timestamp=None):
+    """Helper to get current time (or a given epoch timestamp) in IST (UTC+5:30) for consistency across deployments"""
+    # Callers compare against naive schedule datetimes, so drop the tzinfo
+    if timestamp is not None:
+        return datetime.fromtimestamp(timestamp, _IST).replace(tzinfo=None)
+    return datetime.now(_IST).replace(tzinfo=None)
 
 def ensure_directories():
     """Create all necessary directories if they don't exist"""
@@ -214,12 +223,30 @@ def ensure_directories():
         MODELS_DIR, REPORTS_DIR, FIGURES_DIR, LOG_DIR
     ]
     
-    for directory in directories:
-        directory.mkdir(parents=True, exist_ok=True)
+    # mkdir is a stat+create round trip; on network-mounted storage run them concurrently
+    with ThreadPoolExecutor(max_workers=len(directories)) as ex:
+        list(ex.map(lambda d: d.mkdir(parents=True, exist_ok=True), directories))
     
     print("✅ All required directories are ready")
 
 
+def setup_logging():
+    """Configure root logging once: console plus LOG_FILE under LOG_DIR.
+       Gunicorn workers all append to the same file, so rotation is left to an external tool
+       (logrotate); WatchedFileHandler reopens the file when it is moved away.
+    """
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=LOG_LEVEL,
+        format=LOG_FORMAT,
+        datefmt=LOG_DATE_FORMAT,
+        handlers=[
+            logging.StreamHandler(),
+            WatchedFileHandler(LOG_FILE, encoding="utf-8"),
+        ],
+    )
+
+
 def get_database_uri():
     """Get database connection URI"""
     return f"sqlite:///{DB_PATH}"
@@ -238,8 +265,13 @@ def validate_environment():
     if not OPENWEATHER_API_KEY:
         issues.append("⚠️  OPENWEATHER_API_KEY not set in .env file")
     
-    # Check for model files (only if models should exist)
-    if XGBOOST_MODEL_PATH.exists() and not LABEL_ENCODERS_PATH.exists():
+    # Check for model files (only if models should exist); one directory listing instead of a stat per file
+    try:
+        with os.scandir(MODELS_DIR) as entries:
+            present = {e.name for e in entries}
+    except FileNotFoundError:
+        present = set()
+    if XGBOOST_MODEL_PATH.name in present and LABEL_ENCODERS_PATH.name not in present:
         issues.append("❌ Model file exists but label encoders are missing")
     
     if issues:
@@ -1,70 +1,254 @@
 
 import pandas as pd
+import numpy as np
 import sqlite3
-from sqlalchemy import create_engine
 import os
 import sys
+import logging
+from collections import deque
+from itertools import islice
 from pathlib import Path
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pa_parquet
+except ImportError:
+    # PyArrow is optional: fall back to pandas' chunked C parser
+    pa = None
+    pa_csv = None
+    pa_parquet = None
+
 # Add project root to path
-sys.path.insert(0, str(Path(__file__).parent.absolute()))
+_HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(_HERE))
 import config
+from src.database.db_config import create_schedule_indexes, materialize_schedule_times, refresh_hourly_rollup
+
+logger = logging.getLogger(__name__)
+
+# Rows parsed per read_csv chunk while streaming the features file
+CSV_CHUNK_ROWS = 200_000
+
+# Bytes per Arrow record batch when PyArrow is available
+ARROW_BLOCK_SIZE = 32 << 20
+
+# Kept as text so Arrow does not infer date32/time32 and change what gets stored
+TEXT_COLUMNS = ['Date', 'Scheduled_Departure', 'Scheduled_Arrival', 'Actual_Departure', 'Actual_Arrival']
+
+# Narrow parse-time types for the bounded integer feature columns (absent columns are ignored)
+NARROW_INT_COLUMNS = {
+    'Is_Holiday': 'int8', 'Is_Peak_Hour': 'int8', 'Event_Scheduled': 'int8', 'Is_Weekend': 'int8',
+    'Weather_Score': 'int8', 'Traffic_Score': 'int8', 'Weather_Traffic_Index': 'int8',
+    'Month': 'int8', 'Day_of_Week': 'int8', 'Dep_Hour': 'int8',
+    'Delay_Minutes': 'int16', 'Humidity_Pct': 'int16', 'Passenger_Load': 'int16',
+}
+
+# Rows bound per executemany call during the bulk load
+INSERT_BATCH_ROWS = 10_000
+
+# Build-connection settings: the load runs in an in-memory DB (no journal file, no fsync),
+# so only sort/temp placement and page-cache size matter
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-200000",
+]
+
+# numpy dtype kind -> SQLite column type (anything else is stored as TEXT)
+SQLITE_TYPES = {'i': 'INTEGER', 'u': 'INTEGER', 'b': 'INTEGER', 'f': 'REAL'}
+
+def _iter_csv_chunks(source_path):
+    """Yield the CSV as DataFrame chunks: Arrow-backed via PyArrow if installed, else pandas"""
+    if pa_csv is None:
+        yield from pd.read_csv(source_path, chunksize=CSV_CHUNK_ROWS, dtype=NARROW_INT_COLUMNS)
+        return
+    column_types = {c: pa.from_numpy_dtype(np.dtype(t)) for c, t in NARROW_INT_COLUMNS.items()}
+    column_types.update({c: pa.string() for c in TEXT_COLUMNS})
+    reader = pa_csv.open_csv(
+        source_path,
+        read_options=pa_csv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            strings_can_be_null=True  # empty fields become NULL, as with pandas
+        )
+    )
+    for batch in reader:
+        yield batch.to_pandas(types_mapper=pd.ArrowDtype)
+
+def _iter_parquet_chunks(source_path):
+    """Yield the Parquet feature set as Arrow-backed DataFrame chunks"""
+    for batch in pa_parquet.ParquetFile(source_path).iter_batches(batch_size=CSV_CHUNK_ROWS):
+        yield batch.to_pandas(types_mapper=pd.ArrowDtype)
+
+def _iter_source_chunks(source_path):
+    if str(source_path).endswith('.parquet'):
+        return _iter_parquet_chunks(source_path)
+    return _iter_csv_chunks(source_path)
+
+def _pick_source():
+    """Prefer the Parquet feature set when it is readable and at least as fresh as the CSV"""
+    csv_path, parquet_path = config.FEATURES_DATA_FILE, config.FEATURES_PARQUET_FILE
+    if pa_parquet is not None and os.path.exists(parquet_path):
+        if not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+            return parquet_path
+    return csv_path
+
+def _sample_tail_per_mode(chunks, limit):
+    """
+    Balanced sample: the latest `limit // n_modes` rows of every transport mode.
+    The mode count is only known at the end, so up to `limit` rows per mode are kept while streaming.
+    """
+    tails = {}
+    for chunk in chunks:
+        for mode, group in chunk.groupby('Transport_Type', sort=False):
+            entry = tails.setdefault(mode, {"frames": deque(), "rows": 0})
+            entry["frames"].append(group)
+            entry["rows"] += len(group)
+            # Evict whole frames that fall entirely outside the tail window
+            while entry["rows"] - len(entry["frames"][0]) >= limit:
+                entry["rows"] -= len(entry["frames"].popleft())
+    
+    # Determine unique modes (order of first appearance)
+    modes = list(tails.keys())
+    limit_per_mode = limit // len(modes)
+    logger.info("📊 Detected modes: %s", modes)
+    logger.info("📈 Sampling %d latest records for each mode...", limit_per_mode)
+    # One grouped pass trims every mode; frames stay grouped by mode in first-appearance order
+    retained = pd.concat([frame for mode in modes for frame in tails[mode]["frames"]])
+    return retained.groupby('Transport_Type', sort=False, observed=True).tail(limit_per_mode)
 
-def create_deployment_db(limit=20000):
+def _sample_head(chunks, limit):
+    """First `limit` rows of the source; stops reading as soon as they are collected"""
+    logger.info("📈 Taking the first %d records...", limit)
+    frames, rows = [], 0
+    for chunk in chunks:
+        frames.append(chunk.head(limit - rows))
+        rows += len(frames[-1])
+        if rows >= limit:
+            break
+    return pd.concat(frames)
+
+def _sample_random(chunks, limit, seed=config.RANDOM_STATE):
+    """Uniform random sample of `limit` rows in one pass (reservoir via random priority keys)"""
+    logger.info("📈 Sampling %d random records...", limit)
+    rng = np.random.default_rng(seed)
+    kept = None
+    for chunk in chunks:
+        chunk = chunk.assign(_key=rng.random(len(chunk)))
+        kept = chunk if kept is None else pd.concat([kept, chunk])
+        kept = kept.nlargest(limit, '_key')
+    return kept.drop(columns=['_key'])
+
+SAMPLERS = {
+    'balanced_tail': _sample_tail_per_mode,
+    'head': _sample_head,
+    'random': _sample_random,
+}
+
+def _chronological_order(df):
+    """Row positions ordered by (Date, Scheduled_Departure), sorted as one numeric key instead of strings.
+       Departures that are not H:MM (e.g. 'Missing') sort last within their day.
+    """
+    days = pd.to_datetime(df['Date']).to_numpy('datetime64[D]').astype(np.int64)
+    parts = df['Scheduled_Departure'].astype(str).str.split(':', n=1, expand=True).reindex(columns=[0, 1])
+    minutes = (pd.to_numeric(parts[0], errors='coerce') * 60 + pd.to_numeric(parts[1], errors='coerce')).to_numpy(dtype=float)
+    minutes = np.nan_to_num(minutes, nan=1440.0)
+    return np.argsort(days * 1441 + minutes, kind='stable')
+
+
+def _shrink(df):
+    """
+    Downcast integer columns and turn low-cardinality text columns into categoricals.
+    Floats are left as float64: float32 would change the REAL values written to SQLite.
+    """
+    for col in df.select_dtypes('integer'):
+        df[col] = pd.to_numeric(df[col], downcast='unsigned' if df[col].min() >= 0 else 'integer')
+    for col in df.select_dtypes(include=['object', 'string']):
+        if df[col].nunique() / max(1, len(df)) < 0.5:
+            df[col] = df[col].astype('category')
+    return df
+
+def _write_schedules(df, target_path):
     """
-    Creates a lightweight transport.db for deployment by sampling
-    the processed dataset equally across transport modes.
+    Bulk-load `df` into a fresh `schedules` table in an in-memory DB, then write it out with
+    VACUUM INTO: inserts and index builds run at RAM speed and the file lands in one sequential pass.
     """
-    source_path = config.FEATURES_DATA_FILE
+    columns = ", ".join(f'"{col}" {SQLITE_TYPES.get(dtype.kind, "TEXT")}' for col, dtype in df.dtypes.items())
+    insert_sql = f"INSERT INTO schedules VALUES ({', '.join('?' * len(df.columns))})"
+    if df.isna().any().any():
+        # Arrow-backed columns yield pd.NA, which sqlite3 cannot bind
+        df = df.astype(object).where(df.notna(), None)
+    
+    conn = sqlite3.connect(":memory:")
+    try:
+        for pragma in BULK_LOAD_PRAGMAS:
+            conn.execute(pragma)
+        conn.execute("BEGIN")
+        conn.execute("DROP TABLE IF EXISTS schedules")
+        conn.execute(f"CREATE TABLE schedules ({columns})")
+        # Plain tuples straight from the frame: no per-row dict construction
+        rows = df.itertuples(index=False, name=None)
+        while True:
+            batch = list(islice(rows, INSERT_BATCH_ROWS))
+            if not batch:
+                break
+            conn.executemany(insert_sql, batch)
+        conn.commit()
+        materialize_schedule_times(conn)
+        # Index only after the load so B-trees are built once, not per inserted row
+        create_schedule_indexes(conn)
+        refresh_hourly_rollup(conn)
+        conn.commit()
+        # VACUUM INTO refuses to overwrite an existing file
+        Path(target_path).unlink(missing_ok=True)
+        conn.execute("VACUUM INTO ?", (str(target_path),))
+    finally:
+        conn.close()
+
+def create_deployment_db(limit=20000, strategy='balanced_tail'):
+    """
+    Creates a lightweight transport.db for deployment by sampling the processed dataset.
+    strategy: 'balanced_tail' (latest records, equal share per transport mode),
+              'head' (first `limit` records) or 'random' (uniform random sample).
+    """
+    if strategy not in SAMPLERS:
+        raise ValueError(f"Unknown sampling strategy '{strategy}'. Choose from {list(SAMPLERS)}")
+    source_path = _pick_source()
     target_path = config.DB_PATH
     
-    print(f"🚀 Creating balanced deployment DB from {source_path}...")
+    logger.info("🚀 Creating %s deployment DB from %s...", strategy, source_path)
     
     if os.path.exists(target_path):
-        print(f"🧹 Removing existing database at {target_path}...")
+        logger.info("🧹 Removing existing database at %s...", target_path)
         os.remove(target_path)
     
     if not os.path.exists(source_path):
-        print(f"❌ Source file not found: {source_path}")
+        logger.error("❌ Source file not found: %s", source_path)
         return
 
     try:
-        full_df = pd.read_csv(source_path)
-        
-        # Determine unique modes
-        modes = full_df['Transport_Type'].unique()
-        limit_per_mode = limit // len(modes)
-        
-        print(f"📊 Detected modes: {list(modes)}")
-        print(f"📈 Sampling {limit_per_mode} latest records for each mode...")
-        
-        sampled_dfs = []
-        for mode in modes:
-            mode_df = full_df[full_df['Transport_Type'] == mode].tail(limit_per_mode)
-            sampled_dfs.append(mode_df)
-            
-        df = pd.concat(sampled_dfs).sort_values(['Date', 'Scheduled_Departure'])
+        # Stream the source so peak memory is bounded by the sample, not the full file
+        sampled = SAMPLERS[strategy](_iter_source_chunks(source_path), limit)
+        df = sampled.take(_chronological_order(sampled))
         
         # Ensure ID column is unique and starts from 1
         if 'id' in df.columns:
             df = df.drop(columns=['id'])
         df.insert(0, 'id', range(1, len(df) + 1))
+        df = _shrink(df)
 
         # Create/Replace DB
-        db_url = f'sqlite:///{os.path.abspath(target_path)}'
-        engine = create_engine(db_url)
-        
-        df.to_sql('schedules', con=engine, if_exists='replace', index=False)
+        _write_schedules(df, target_path)
         
-        print(f"✅ Successfully created {target_path} with {len(df)} records.")
-        print(f"💾 DB Size: {os.path.getsize(target_path) / (1024*1024):.2f} MB")
+        logger.info("✅ Successfully created %s with %d records.", target_path, len(df))
+        logger.info("💾 DB Size: %.2f MB", os.path.getsize(target_path) / (1024*1024))
         
         # Verification snippet
-        print("\n🔍 Verification of records per mode:")
-        print(df['Transport_Type'].value_counts())
+        logger.info("🔍 Verification of records per mode:\n%s", df['Transport_Type'].value_counts())
         
     except Exception as e:
-        print(f"❌ Failed: {e}")
+        logger.exception("❌ Failed: %s", e)
 
 if __name__ == "__main__":
+    config.setup_logging()
     create_deployment_db()
@@ -63,6 +63,20 @@ class FeatureEngineer:
         self.df.to_csv(self.output_path, index=False)
         print(f"✅ Feature set saved to: {self.output_path}")
         print(f"   Columns: {list(self.df.columns)[-5:]} ...")
+        self.save_parquet()
+
+    def save_parquet(self):
+        """Columnar copy for downstream readers (deployment DB build); optional, needs PyArrow"""
+        parquet_path = os.path.splitext(self.output_path)[0] + '.parquet'
+        # Keep Date as the same YYYY-MM-DD text the CSV carries
+        out = self.df.copy()
+        if 'Date' in out.columns and pd.api.types.is_datetime64_any_dtype(out['Date']):
+            out['Date'] = out['Date'].dt.strftime('%Y-%m-%d')
+        try:
+            out.to_parquet(parquet_path, index=False, compression='zstd')
+            print(f"✅ Parquet copy saved to: {parquet_path}")
+        except ImportError:
+            print("ℹ️  PyArrow not installed; skipping Parquet copy.")
 
 if __name__ == "__main__":
     input_file = 'data/processed/hyderabad_transport_cleaned.csv'
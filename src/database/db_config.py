@@ -7,6 +7,71 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 import config
 
+# Indexes on `schedules` shared by init_db and the deployment DB build
+SCHEDULE_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_route ON schedules(from_location, to_location, transport_type, date)',
+    'CREATE INDEX IF NOT EXISTS idx_service_id ON schedules(service_id)',
+    # Tables built via pandas.to_sql have no PRIMARY KEY, so index id for /track lookups
+    'CREATE INDEX IF NOT EXISTS idx_sched_id ON schedules(id)',
+    # Serves date-only lookups as well as chronological (date, departure) scans
+    'CREATE INDEX IF NOT EXISTS idx_time ON schedules(date, scheduled_departure)',
+]
+
+def create_schedule_indexes(conn):
+    """Create the schedules indexes and refresh planner statistics so they are picked up"""
+    for ddl in SCHEDULE_INDEXES:
+        conn.execute(ddl)
+    conn.execute('ANALYZE')
+
+# Departure clock and scheduled run time, parsed from the HH:MM strings once at ingest so
+# request paths (search batches, tracking) do arithmetic instead of strptime.
+# Run time wraps past midnight (23:30 -> 00:15 is 45 minutes).
+SCHEDULE_TIME_COLUMNS = ['Dep_Hour', 'Dep_Minute', 'Duration_Min']
+
+_HH = "CAST(substr({0}, 1, instr({0}, ':') - 1) AS INTEGER)"
+_MM = "CAST(substr({0}, instr({0}, ':') + 1) AS INTEGER)"
+SCHEDULE_TIMES_UPDATE = f'''
+UPDATE schedules SET
+    dep_hour = {_HH.format('scheduled_departure')},
+    dep_minute = {_MM.format('scheduled_departure')},
+    duration_min = CASE WHEN scheduled_arrival LIKE '%_:__'
+        THEN ({_HH.format('scheduled_arrival')} * 60 + {_MM.format('scheduled_arrival')}
+              - ({_HH.format('scheduled_departure')} * 60 + {_MM.format('scheduled_departure')}) + 1440) % 1440
+    END
+WHERE dep_minute IS NULL AND scheduled_departure LIKE '%_:__'
+'''
+
+def materialize_schedule_times(conn):
+    """Add any missing time columns to `schedules` and fill them for rows that do not have them yet"""
+    existing = {row[1].lower() for row in conn.execute("PRAGMA table_info(schedules)")}
+    for col in SCHEDULE_TIME_COLUMNS:
+        if col.lower() not in existing:
+            conn.execute(f'ALTER TABLE schedules ADD COLUMN {col} INTEGER')
+    conn.execute(SCHEDULE_TIMES_UPDATE)
+
+# Hour-bucketed delay rollup read by /analytics instead of aggregating `schedules` per request
+HOURLY_ROLLUP_DDL = '''
+CREATE TABLE IF NOT EXISTS schedules_by_hour (
+    hour INTEGER PRIMARY KEY,
+    avg_delay REAL,
+    cnt INTEGER,
+    rain_cnt INTEGER,
+    peak_cnt INTEGER,
+    event_cnt INTEGER
+)
+'''
+
+HOURLY_ROLLUP_SELECT = '''
+SELECT dep_hour, AVG(delay_minutes), COUNT(*), SUM(weather LIKE '%Rain%'), SUM(is_peak_hour), SUM(event_scheduled)
+FROM schedules WHERE dep_hour IS NOT NULL GROUP BY dep_hour
+'''
+
+def refresh_hourly_rollup(conn):
+    """Rebuild schedules_by_hour from the current schedules table"""
+    conn.execute(HOURLY_ROLLUP_DDL)
+    conn.execute('DELETE FROM schedules_by_hour')
+    conn.execute(f'INSERT INTO schedules_by_hour {HOURLY_ROLLUP_SELECT}')
+
 def init_db(db_path=None):
     """Initialize the database schema and create necessary tables"""
     target_path = db_path or str(config.DB_PATH)
@@ -48,14 +113,12 @@ def init_db(db_path=None):
         month INTEGER,
         day_of_week INTEGER,
         is_weekend INTEGER,
-        dep_hour INTEGER
+        dep_hour INTEGER,
+        dep_minute INTEGER,
+        duration_min INTEGER
     )
     ''')
     
-    # Create Indexes for optimization
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_route ON schedules(from_location, to_location, transport_type, date)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_service_id ON schedules(service_id)')
-    
     # Create Table for Predictions (Audit Log)
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS predictions (
@@ -70,6 +133,11 @@ def init_db(db_path=None):
     )
     ''')
     
+    # Create Indexes for optimization
+    materialize_schedule_times(cursor)
+    create_schedule_indexes(cursor)
+    refresh_hourly_rollup(cursor)
+    
     conn.commit()
     conn.close()
     print(f"✅ Database initialized successfully.")
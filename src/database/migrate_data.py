@@ -8,6 +8,17 @@ from pathlib import Path
 # Add project root to path to import config
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 import config
+from src.database.db_config import materialize_schedule_times, refresh_hourly_rollup
+
+def _executemany_insert(table, conn, keys, data_iter):
+    """to_sql insert method: bind row tuples straight to the DBAPI cursor (no per-row dicts)"""
+    columns = ", ".join(f'"{k}"' for k in keys)
+    placeholders = ", ".join("?" * len(keys))
+    cursor = conn.connection.cursor()
+    try:
+        cursor.executemany(f'INSERT INTO "{table.name}" ({columns}) VALUES ({placeholders})', data_iter)
+    finally:
+        cursor.close()
 
 def migrate_csv_to_database(csv_path=None, db_path=None):
     """Migrate feature-engineered CSV data to the SQLite database"""
@@ -35,8 +46,13 @@ def migrate_csv_to_database(csv_path=None, db_path=None):
         engine = create_engine(db_url)
         
         # Load to SQL - 'replace' starts fresh, 'append' adds to existing
-        # Using 'replace' for the schedules table to ensure consistent state
-        df.to_sql('schedules', con=engine, if_exists='replace', index=False)
+        # Using 'replace' for the schedules table to ensure consistent state.
+        # One transaction, executemany in bounded chunks (method='multi' is slower on SQLite).
+        with engine.begin() as conn:
+            df.to_sql('schedules', con=conn, if_exists='replace', index=False, chunksize=10000,
+                      method=_executemany_insert)
+            materialize_schedule_times(conn.connection)
+            refresh_hourly_rollup(conn.connection)
         
         print(f"✅ Migration complete! {len(df)} rows inserted into 'schedules' table.")
         return True
@@ -1,22 +1,105 @@
 import sqlite3
 import pandas as pd
+import os
 import sys
+import logging
+import threading
 from pathlib import Path
 
 # Add project root to path to import config
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 import config
+from src.database.db_config import HOURLY_ROLLUP_SELECT
+
+logger = logging.getLogger(__name__)
+
+# Applied once per connection; connections then live as long as their thread. Only connection-scoped
+# settings belong here: journal_mode is persisted in the file header, so setting it would rewrite the
+# shipped DB on first read and fail on a read-only deploy
+CONN_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",      # ~20 MB page cache, kept warm across requests
+    "PRAGMA mmap_size=268435456",    # reads served from a 256 MB memory map
+)
+
+# sqlite3 keeps compiled statements per connection, keyed on the exact SQL text, so the hot queries
+# below are fixed module-level strings (no per-call formatting) and the cache has room for all of them
+STATEMENT_CACHE_SIZE = 256
+
+_ROUTE_DETAILS_SQL = "SELECT * FROM schedules WHERE From_Location = ? AND To_Location = ? AND Transport_Type = ? LIMIT 1"
+_ROUTE_DETAILS_ANY_MODE_SQL = "SELECT * FROM schedules WHERE From_Location = ? AND To_Location = ? LIMIT 1"
+
+_SCHEDULES_SQL = (
+    "SELECT * FROM schedules WHERE From_Location = ? AND To_Location = ? AND Transport_Type = ? AND Date = ? "
+    "ORDER BY Scheduled_Departure ASC"
+)
+_SCHEDULES_ANY_MODE_SQL = (
+    "SELECT * FROM schedules WHERE From_Location = ? AND To_Location = ? AND Date = ? "
+    "ORDER BY Scheduled_Departure ASC"
+)
+
+# Template-date ordering: same weekday as the requested date first, then most recent.
+# SQLite's %w is 0=Sunday while Day_of_Week is 0=Monday, hence the (+6) % 7 shift.
+_SAME_WEEKDAY_FIRST = "ORDER BY (Day_of_Week = (CAST(strftime('%w', ?) AS INTEGER) + 6) % 7) DESC, Date DESC LIMIT 1"
+_TEMPLATE_DATE_SQL = (
+    "SELECT Date FROM schedules WHERE From_Location = ? AND To_Location = ? AND Transport_Type = ? "
+    + _SAME_WEEKDAY_FIRST
+)
+_TEMPLATE_DATE_ANY_MODE_SQL = "SELECT Date FROM schedules WHERE From_Location = ? AND To_Location = ? " + _SAME_WEEKDAY_FIRST
+
+_HOURLY_DELAYS_SQL = "SELECT hour, avg_delay, cnt, rain_cnt, peak_cnt, event_cnt FROM schedules_by_hour ORDER BY hour"
 
 class TransportDB:
     def __init__(self, db_path=None):
         self.db_path = db_path or str(config.DB_PATH)
+        self._local = threading.local()
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+
+    def _file_id(self):
+        """(device, inode) of the DB file; changes when a rebuild replaces the file rather than editing it"""
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def _bump_generation(self):
+        with self._generation_lock:
+            self._generation += 1
 
     def get_conn(self):
-        """Create a database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable row access by name
+        """Return this thread's database connection, opening it on first use (callers must not close it)"""
+        conn = getattr(self._local, 'conn', None)
+        file_id = self._file_id()
+        if conn is not None and self._local.file_id != file_id:
+            # create_deploy_db unlinks the file and VACUUMs INTO a new one: an open connection would
+            # keep reading the deleted inode forever, so reopen and invalidate memoized reads
+            conn.close()
+            conn = None
+            self._bump_generation()
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row  # Enable row access by name
+            for pragma in CONN_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.file_id = file_id
+            self._local.data_version = None
         return conn
 
+    def data_version(self):
+        """Counter that moves once the DB changes underneath this process (re-ingest in place or file rebuilt)"""
+        # PRAGMA data_version is only comparable within one connection, so each thread tracks its own
+        # last-seen value and a change bumps the generation shared by all threads
+        seen = self.get_conn().execute("PRAGMA data_version").fetchone()[0]
+        last = self._local.data_version
+        self._local.data_version = seen
+        if last is not None and seen != last:
+            self._bump_generation()
+        return self._generation
+
     def get_locations(self):
         """Fetch all unique locations with case-insensitive column handling"""
         conn = self.get_conn()
@@ -33,108 +116,86 @@ class TransportDB:
             locs = [row[0] for row in cursor.fetchall() if row[0]]
             return sorted(locs)
         except Exception as e:
-            print(f"Error fetching locations: {e}")
+            logger.error("Error fetching locations: %s", e)
             return ["Secunderabad", "Koti", "Begumpet", "Hitech City", "Miyapur"]
-        finally:
-            conn.close()
 
     def get_route_details(self, from_loc, to_loc, transport_type=None):
         """Fetch distance and intermediate stops for a route"""
         conn = self.get_conn()
-        cursor = conn.cursor()
         try:
-            query = "SELECT * FROM schedules WHERE From_Location = ? AND To_Location = ?"
-            params = [from_loc, to_loc]
-            
-            if transport_type and transport_type.lower() != 'all':
-                query += " AND Transport_Type = ?"
-                params.append(transport_type)
-                
-            query += " LIMIT 1"
-            
-            cursor.execute(query, tuple(params))
-            row = cursor.fetchone()
+            by_mode = transport_type and transport_type.lower() != 'all'
+            if by_mode:
+                row = conn.execute(_ROUTE_DETAILS_SQL, (from_loc, to_loc, transport_type)).fetchone()
+            else:
+                row = conn.execute(_ROUTE_DETAILS_ANY_MODE_SQL, (from_loc, to_loc)).fetchone()
             if row:
                 return {k.lower(): row[k] for k in row.keys()}
             
             # Fallback for route details
-            if transport_type and transport_type.lower() != 'all':
-                cursor.execute("SELECT * FROM schedules WHERE From_Location = ? AND To_Location = ? LIMIT 1", (from_loc, to_loc))
-                row = cursor.fetchone()
+            if by_mode:
+                row = conn.execute(_ROUTE_DETAILS_ANY_MODE_SQL, (from_loc, to_loc)).fetchone()
                 if row:
                     return {k.lower(): row[k] for k in row.keys()}
 
             return None
         except Exception as e:
-            print(f"Error fetching route details: {e}")
+            logger.error("Error fetching route details: %s", e)
             return None
-        finally:
-            conn.close()
+
+    def get_route_keys(self):
+        """Distinct (from, to, transport_type) combinations present in the schedules"""
+        conn = self.get_conn()
+        try:
+            return conn.execute(
+                "SELECT DISTINCT From_Location, To_Location, Transport_Type FROM schedules"
+            ).fetchall()
+        except Exception as e:
+            logger.error("Error fetching route keys: %s", e)
+            return []
 
     def get_schedules_by_route(self, from_loc, to_loc, transport_type, date):
-        """Fetch schedules matching criteria with fallback to template dates"""
+        """Fetch schedules matching criteria with fallback to template dates (list of row dicts)"""
         conn = self.get_conn()
         
-        mode_filter = "AND Transport_Type = ?" if transport_type.lower() != 'all' else ""
+        any_mode = transport_type.lower() == 'all'
+        schedules_sql = _SCHEDULES_ANY_MODE_SQL if any_mode else _SCHEDULES_SQL
+        template_sql = _TEMPLATE_DATE_ANY_MODE_SQL if any_mode else _TEMPLATE_DATE_SQL
+        route = (from_loc, to_loc) if any_mode else (from_loc, to_loc, transport_type)
         
         # 1. Try exact date match first
-        query = f"""
-        SELECT * FROM schedules 
-        WHERE From_Location = ? 
-        AND To_Location = ? 
-        {mode_filter}
-        AND Date = ?
-        ORDER BY Scheduled_Departure ASC
-        """
-        
-        params = [from_loc, to_loc]
-        if transport_type.lower() != 'all':
-            params.append(transport_type)
-        params.append(date)
-        
-        df = pd.read_sql_query(query, conn, params=tuple(params))
+        rows = conn.execute(schedules_sql, route + (date,)).fetchall()
         
-        # 2. Fallback: Template Date
-        if df.empty:
-            cursor = conn.cursor()
-            check_q = f"SELECT DISTINCT Date FROM schedules WHERE From_Location = ? AND To_Location = ? {mode_filter} ORDER BY Date DESC LIMIT 1"
-            check_params = [from_loc, to_loc]
-            if transport_type.lower() != 'all':
-                check_params.append(transport_type)
-            
-            cursor.execute(check_q, tuple(check_params))
-            row = cursor.fetchone()
-            
+        # 2. Fallback: Template Date (prefer the latest one on the same weekday)
+        if not rows:
+            row = conn.execute(template_sql, route + (date,)).fetchone()
             if row:
-                template_date = row[0]
-                df_params = [from_loc, to_loc]
-                if transport_type.lower() != 'all':
-                    df_params.append(transport_type)
-                df_params.append(template_date)
-                df = pd.read_sql_query(query, conn, params=tuple(df_params))
+                rows = conn.execute(schedules_sql, route + (row[0],)).fetchall()
                 
             # 3. Fallback: ANY mode if specific mode failed
-            if df.empty and transport_type.lower() != 'all':
-                alt_query = """
-                SELECT * FROM schedules 
-                WHERE From_Location = ? 
-                AND To_Location = ? 
-                AND Date = ?
-                ORDER BY Scheduled_Departure ASC
-                """
-                df = pd.read_sql_query(alt_query, conn, params=(from_loc, to_loc, date))
+            if not rows and not any_mode:
+                rows = conn.execute(_SCHEDULES_ANY_MODE_SQL, (from_loc, to_loc, date)).fetchall()
                 
                 # 4. Fallback: ANY mode, template date
-                if df.empty:
-                    check_q_alt = "SELECT DISTINCT Date FROM schedules WHERE From_Location = ? AND To_Location = ? ORDER BY Date DESC LIMIT 1"
-                    cursor.execute(check_q_alt, (from_loc, to_loc))
-                    row_alt = cursor.fetchone()
+                if not rows:
+                    row_alt = conn.execute(_TEMPLATE_DATE_ANY_MODE_SQL, (from_loc, to_loc, date)).fetchone()
                     if row_alt:
-                        template_alt = row_alt[0]
-                        df = pd.read_sql_query(alt_query, conn, params=(from_loc, to_loc, template_alt))
+                        rows = conn.execute(_SCHEDULES_ANY_MODE_SQL, (from_loc, to_loc, row_alt[0])).fetchall()
         
-        conn.close()
-        return df
+        return [dict(r) for r in rows]
+
+    def get_hourly_delays(self):
+        """Per-hour delay rollup; aggregated on the fly for databases built before the rollup existed"""
+        conn = self.get_conn()
+        try:
+            try:
+                rows = conn.execute(_HOURLY_DELAYS_SQL).fetchall()
+            except sqlite3.OperationalError:
+                rows = conn.execute(f"{HOURLY_ROLLUP_SELECT} ORDER BY dep_hour").fetchall()
+            keys = ("hour", "avg_delay", "cnt", "rain_cnt", "peak_cnt", "event_cnt")
+            return [dict(zip(keys, row)) for row in rows]
+        except Exception as e:
+            logger.error("Error fetching hourly delays: %s", e)
+            return []
 
     def save_prediction(self, from_loc, to_loc, t_type, sched_time, delay, reason):
         """Audit log for predictions made via the application"""
@@ -147,16 +208,15 @@ class TransportDB:
             """, (from_loc, to_loc, t_type, sched_time, delay, reason))
             conn.commit()
         except Exception as e:
-            print(f"❌ Error saving prediction audit: {e}")
-        finally:
-            conn.close()
+            # The connection is reused, so don't leave a half-done transaction on it
+            conn.rollback()
+            logger.error("❌ Error saving prediction audit: %s", e)
 
     def get_recent_predictions(self, limit=10):
         """Fetch recent prediction history"""
         query = "SELECT * FROM predictions ORDER BY timestamp DESC LIMIT ?"
         conn = self.get_conn()
         df = pd.read_sql_query(query, conn, params=(limit,))
-        conn.close()
         return df
 
 if __name__ == "__main__":
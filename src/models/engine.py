@@ -5,14 +5,115 @@ import os
 import requests
 import random
 import hashlib
-from datetime import datetime, timedelta
+import logging
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
 from dotenv import load_dotenv
 
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional: without it the kernels here and in app.py run as plain NumPy-on-Python loops
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Simulation of major Hyderabad holidays
+MAJOR_HOLIDAYS = {
+    "2026-01-01": "New Year's Day",
+    "2026-01-14": "Sankranti",
+    "2026-01-26": "Republic Day",
+    "2026-08-15": "Independence Day",
+    "2026-10-02": "Gandhi Jayanti",
+    "2026-12-25": "Christmas"
+}
+
+# Seconds between background weather refreshes; requests always read the last snapshot
+WEATHER_REFRESH_SECONDS = 600
+
+# Served until the first successful Open-Meteo fetch
+DEFAULT_WEATHER = {"description": "Clear", "temp": 24.0, "humidity": 50, "is_rainy": False, "source": "Cached/Simulated"}
+
+# For Demo: Trigger events on some dates
+SPECIAL_EVENT_DATES = frozenset(["2026-01-26", "2026-01-30", "2026-02-14"])
+
+@lru_cache(maxsize=16384)
+def _stable_seed(key):
+    """Process-independent integer seed for a string key (not for security).
+       MD5 is kept so published delays/loads do not shift; its digest is read as an int directly.
+    """
+    return int.from_bytes(hashlib.md5(key.encode(), usedforsecurity=False).digest(), 'big')
+
+@lru_cache(maxsize=8192)
+def _service_noise(service_id, date_str):
+    """Stable -2..+3 minute jitter for one service on one date"""
+    return random.Random(_stable_seed(f"{service_id}_{date_str}")).randint(-2, 3)
+
+# Risk tiers produced by _delay_tiers, indexing the label tuples below
+STATUS_LABELS = ("ON TIME", "MINOR DELAY", "MAJOR DELAY")
+RISK_LABELS = ("Low", "Medium", "High")
+
+@njit(cache=True)
+def _passenger_load(hours, offsets, event_flag):
+    """Peak/event base load plus the per-service offset, clipped to 0..100"""
+    n = hours.shape[0]
+    load = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        h = hours[i]
+        base = 85 if (8 <= h <= 11) or (17 <= h <= 20) else 40
+        if event_flag:
+            base += 20
+        load[i] = min(max(base + offsets[i], 0), 100)
+    return load
+
+@njit(cache=True)
+def _delay_tiers(base_delays, noise):
+    """Final delay (base + jitter, floored at 0) and its risk tier: 0 <= 10 min, 1 <= 20 min, 2 above"""
+    n = base_delays.shape[0]
+    delays = np.empty(n, dtype=np.int64)
+    tiers = np.empty(n, dtype=np.int8)
+    for i in range(n):
+        d = max(0, base_delays[i] + noise[i])
+        delays[i] = d
+        tiers[i] = 0 if d <= 10 else (1 if d <= 20 else 2)
+    return delays, tiers
+
+def _hhmm_minutes(times, errors='raise'):
+    """Vectorised 'HH:MM' -> minutes after midnight"""
+    parts = times.astype(str).str.split(':', n=1, expand=True).reindex(columns=[0, 1])
+    hours = pd.to_numeric(parts[0], errors=errors)
+    minutes = pd.to_numeric(parts[1], errors=errors)
+    return (hours * 60 + minutes).to_numpy(dtype=float)
+
+def format_hm(minute_of_day):
+    """Format minutes since midnight as HH:MM (wraps past midnight) without strftime"""
+    return f"{(minute_of_day // 60) % 24:02d}:{minute_of_day % 60:02d}"
+
+def service_clock(service):
+    """(departure minute of day, scheduled run minutes or None) for one schedule row.
+       Uses the ingest-time Dep_Hour/Dep_Minute/Duration_Min columns; rows loaded before they existed are parsed.
+    """
+    dep_hour, dep_minute = service.get('Dep_Hour'), service.get('Dep_Minute')
+    if dep_hour is not None and dep_minute is not None:
+        return dep_hour * 60 + dep_minute, service.get('Duration_Min')
+    hh, mm = (service.get('Scheduled_Departure') or '').split(':')
+    dep = int(hh) * 60 + int(mm)
+    try:
+        hh, mm = (service.get('Scheduled_Arrival') or '').split(':')
+        return dep, (int(hh) * 60 + int(mm) - dep) % 1440
+    except ValueError:
+        return dep, None
+
 class TransportEngine:
     def __init__(self):
-        print("Initializing Logic Core...")
+        logger.info("Initializing Logic Core...")
         self.model_path = 'models/xgboost_delay_model.pkl'
         self.encoder_path = 'models/label_encoders.pkl'
         
@@ -29,26 +130,51 @@ class TransportEngine:
             self.model = joblib.load(self.model_path)
             self.encoders = joblib.load(self.encoder_path)
         else:
-            print("⚠️ ML Artifacts not found. Running in heuristic simulation mode.")
+            logger.warning("⚠️ ML Artifacts not found. Running in heuristic simulation mode.")
             
         # Real-time Telemetry Cache & Circuit Breaker
         self._weather_cache = None
+        self._weather_refresher_pid = None  # Threads do not survive fork, so track which process owns it
+        self._weather_lock = threading.Lock()
         self._traffic_cache = {}
         self._cache_time = None
         self._api_disabled = False # Circuit breaker for connection timeouts
 
     def get_realtime_weather(self):
-        """Fetch highly accurate live weather using Open-Meteo (No-Key Required)
+        """Latest live weather snapshot; only the very first call in a process waits on the API.
+           A daemon thread keeps it fresh every WEATHER_REFRESH_SECONDS (stale-while-revalidate).
+        """
+        if self._weather_cache is None:
+            with self._weather_lock:
+                if self._weather_cache is None:
+                    self._weather_cache = self._fetch_weather() or dict(DEFAULT_WEATHER)
+                    self._cache_time = datetime.now()
+        if self._weather_refresher_pid != os.getpid():
+            self._start_weather_refresher()
+        return self._weather_cache
+
+    def _start_weather_refresher(self):
+        with self._weather_lock:
+            if self._weather_refresher_pid == os.getpid():
+                return
+            self._weather_refresher_pid = os.getpid()
+            threading.Thread(target=self._weather_refresher, name="weather-refresh", daemon=True).start()
+
+    def _weather_refresher(self):
+        while True:
+            time.sleep(WEATHER_REFRESH_SECONDS)
+            weather_data = self._fetch_weather()
+            if weather_data:
+                # Swap in a new dict so readers never see a half-updated snapshot; on failure keep the last one
+                self._weather_cache = weather_data
+            self._cache_time = datetime.now()
+
+    def _fetch_weather(self):
+        """Fetch highly accurate live weather using Open-Meteo (No-Key Required), or None if unavailable
            Refined to match Google Search results (Apparent Temp + Precision Mapping)
         """
-        now = datetime.now()
-        # 10-minute caching for API efficiency
-        if self._weather_cache and self._cache_time and (now - self._cache_time).seconds < 600:
-            return self._weather_cache
-
         lat, lon = 17.3850, 78.4867
-        # Default fallback
-        weather_data = {"description": "Clear", "temp": 24.0, "humidity": 50, "is_rainy": False, "source": "Cached/Simulated"}
+        weather_data = None
         
         try:
             # Using Open-Meteo with apparent_temperature to match Google's 'Feels Like' perception
@@ -85,10 +211,8 @@ class TransportEngine:
                     "source": "Open-Meteo Real-Time"
                 }
         except Exception as e:
-            print(f"📡 Remote Weather API error: {e}")
+            logger.warning("📡 Remote Weather API error: %s", e)
             
-        self._weather_cache = weather_data
-        self._cache_time = now
         return weather_data
 
     def _get_traffic(self, hour, is_rainy, event_flag):
@@ -133,9 +257,7 @@ class TransportEngine:
 
     def _check_events(self, date_str):
         """Check for major local events via PredictHQ or similar"""
-        # For Demo: Trigger events on some dates
-        special_event_dates = ["2026-01-26", "2026-01-30", "2026-02-14"]
-        if date_str in special_event_dates:
+        if date_str in SPECIAL_EVENT_DATES:
             return 1
 
         if not self._api_disabled and self.event_key and self.event_key not in ["YOUR_EVENT_API_KEY", ""]:
@@ -150,32 +272,22 @@ class TransportEngine:
         return 0
 
     def _check_holidays(self, date_str):
-        # Simulation of major Hyderabad holidays
-        major_holidays = {
-            "2026-01-01": "New Year's Day",
-            "2026-01-14": "Sankranti",
-            "2026-01-26": "Republic Day",
-            "2026-08-15": "Independence Day",
-            "2026-10-02": "Gandhi Jayanti",
-            "2026-12-25": "Christmas"
-        }
-        return major_holidays.get(date_str)
+        return MAJOR_HOLIDAYS.get(date_str)
 
 
     def predict_one(self, service, date_str, telemetry=None):
         """Complete Prediction Logic blending ML and Real-time Intelligence"""
         # Deterministic seeding for consistency
-        seed_str = f"{service.get('Service_ID', 'ID')}_{date_str}"
-        seed_hash = int(hashlib.md5(seed_str.encode()).hexdigest(), 16)
-        rng = random.Random(seed_hash)
+        rng = random.Random(_stable_seed(f"{service.get('Service_ID', 'ID')}_{date_str}"))
 
         # Time context
         try: dt = datetime.strptime(date_str, "%Y-%m-%d")
         except: dt = datetime.now()
 
-        hour = 8
-        try: hour = int(service.get('Scheduled_Departure', '09:00').split(':')[0])
-        except: pass
+        hour = service.get('Dep_Hour')
+        if hour is None:
+            try: hour = int(service.get('Scheduled_Departure', '09:00').split(':')[0])
+            except: hour = 8
         
         # Real-time Telemetry
         if telemetry:
@@ -231,7 +343,7 @@ class TransportEngine:
                 delay = self._apply_deterministic_noise(base_delay, service.get('Service_ID'), date_str)
                 
             except Exception as e:
-                print(f"ML Processing Failure: {e}")
+                logger.error("ML Processing Failure: %s", e)
                 delay = self._apply_deterministic_noise(10, service.get('Service_ID'), date_str)
         else:
             delay = self._apply_deterministic_noise(15, service.get('Service_ID'), date_str)
@@ -248,20 +360,15 @@ class TransportEngine:
 
         # Arrival Time Logic for Synchronization
         try:
-            sch_dep = service['Scheduled_Departure']
-            sch_arr = service.get('Scheduled_Arrival', '')
-            base_dt = datetime.strptime(f"{date_str} {sch_dep}", "%Y-%m-%d %H:%M")
-            try:
-                arr_dt = datetime.strptime(f"{date_str} {sch_arr}", "%Y-%m-%d %H:%M")
-                dur = int((arr_dt - base_dt).total_seconds() / 60)
-                if dur <= 0: raise ValueError
-                scheduled_display = sch_arr
-            except:
+            dep_min, dur = service_clock(service)
+            if dur and dur > 0:
+                scheduled_display = service['Scheduled_Arrival']
+            else:
                 dist = service.get('Distance_KM', 25.0)
                 dur = int((dist/30)*60)
-                scheduled_display = (base_dt + timedelta(minutes=dur)).strftime("%H:%M")
+                scheduled_display = format_hm(dep_min + dur)
             
-            p_arrival = (base_dt + timedelta(minutes=dur + delay)).strftime("%H:%M")
+            p_arrival = format_hm(dep_min + dur + delay)
         except:
             scheduled_display = "--:--"
             p_arrival = "--:--"
@@ -280,7 +387,7 @@ class TransportEngine:
             "predicted_arrival": p_arrival
         }
 
-    def _get_reason(self, delay, weather, traffic, event_flag, t_type):
+    def _get_reason(self, delay, weather, traffic, event_flag, t_type, now_hour=None):
         """Generate high-fidelity reasoning using dataset ground-truth categories"""
         if delay <= 5: return "Operational Smoothness"
         
@@ -288,7 +395,8 @@ class TransportEngine:
         # ['Traffic Congestion', 'Signal Delay', 'Technical Glitch', 'Weather Conditions', 'Public Rally', 'Accident']
         
         is_rainy = weather.get('is_rainy', False)
-        now_hour = datetime.now().hour
+        if now_hour is None:
+            now_hour = datetime.now().hour
         is_peak = (8 <= now_hour <= 11) or (17 <= now_hour <= 20)
         
         # 1. Event/Holiday -> Public Rally (Dataset Label)
@@ -316,7 +424,7 @@ class TransportEngine:
                 return "Operational Signal Delay"
         
         # 6. Stochastic Stressors for unexplained delays (Dataset Labels)
-        seed = int(hashlib.md5(f"{t_type}_{delay}".encode()).hexdigest(), 16)
+        seed = _stable_seed(f"{t_type}_{delay}")
         
         if delay > 25:
             return "Major Traffic Congestion + Technical Glitch"
@@ -332,33 +440,32 @@ class TransportEngine:
 
     def _apply_deterministic_noise(self, base_delay, service_id, date_str):
         """Applies consistent noise based on service ID and date to ensure same result across calls"""
-        seed_str = f"{service_id}_{date_str}"
-        seed_hash = int(hashlib.md5(seed_str.encode()).hexdigest(), 16)
-        rng = random.Random(seed_hash)
-        noise = rng.randint(-2, 3) 
-        return max(0, int(base_delay) + noise)
+        return max(0, int(base_delay) + _service_noise(service_id, date_str))
+
+    # Canonical column names used internally regardless of DB casing
+    _BATCH_COLUMNS = {c.lower(): c for c in [
+        'Transport_Type', 'Service_ID', 'Scheduled_Departure', 'Scheduled_Arrival',
+        'From_Location', 'To_Location', 'Distance_KM', 'Dep_Hour', 'Dep_Minute', 'Duration_Min'
+    ]}
 
     def process_batch(self, schedules, date_str):
-        """ULTRA-RESILIENT BATCH PROCESSING: Guaranteed to return results even on ML failure"""
-        if not schedules:
+        """ULTRA-RESILIENT BATCH PROCESSING: Guaranteed to return results even on ML failure
+           Accepts the schedules DataFrame directly (or a list of dicts) to stay columnar.
+        """
+        if not isinstance(schedules, pd.DataFrame):
+            schedules = pd.DataFrame(list(schedules or []))
+        if schedules.empty:
             return []
         
         now = datetime.now()
-        final_results = []
         
-        # 1. Initialize with heuristic defaults (Safety Net)
-        for s in schedules:
-            s_copy = s.copy()
-            # Normalize keys to title case for internal logic consistency
-            for k in list(s_copy.keys()):
-                if k.lower() == 'transport_type': s_copy['Transport_Type'] = s_copy.pop(k)
-                if k.lower() == 'service_id': s_copy['Service_ID'] = s_copy.pop(k)
-                if k.lower() == 'scheduled_departure': s_copy['Scheduled_Departure'] = s_copy.pop(k)
-                if k.lower() == 'scheduled_arrival': s_copy['Scheduled_Arrival'] = s_copy.pop(k)
-                if k.lower() == 'from_location': s_copy['From_Location'] = s_copy.pop(k)
-                if k.lower() == 'to_location': s_copy['To_Location'] = s_copy.pop(k)
-                if k.lower() == 'distance_km': s_copy['Distance_KM'] = s_copy.pop(k)
-
+        # 1. Normalize column names once for internal logic consistency
+        df = schedules.rename(columns={c: self._BATCH_COLUMNS.get(c.lower(), c) for c in schedules.columns})
+        df = df.reset_index(drop=True)
+        
+        # Initialize with heuristic defaults (Safety Net)
+        final_results = df.to_dict('records')
+        for s_copy in final_results:
             # Default safe prediction
             s_copy['prediction'] = {
                 "predicted_delay": 5, "status_text": "ON TIME", "risk_level": "Low",
@@ -367,34 +474,35 @@ class TransportEngine:
                 "recommendation": "Boarding Open", "scheduled_arrival": s_copy.get('Scheduled_Arrival', '--:--'),
                 "predicted_arrival": s_copy.get('Scheduled_Arrival', '--:--'), "is_live": False
             }
-            final_results.append(s_copy)
 
         try:
-            # 2. DataFrame Construction for Vectorized Processing
-            df = pd.DataFrame(final_results)
-            
-            # 3. Environment Context
+            # 2./3. Environment Context
             weather = self.get_realtime_weather()
             is_holiday = self._check_holidays(date_str)
             event_detected = self._check_events(date_str)
             event_flag = 1 if (is_holiday or event_detected) else 0
             
-            # 4. Feature Enrichment
-            df['Dep_Hour'] = pd.to_numeric(df['Scheduled_Departure'].str.split(':').str[0], errors='coerce').fillna(8).astype(int)
+            # 4. Feature Enrichment: departure clock from the ingest-time columns when every row has them
+            if 'Duration_Min' in df.columns and df[['Dep_Hour', 'Dep_Minute']].notna().all().all():
+                df['Dep_Hour'] = df['Dep_Hour'].astype(int)
+                dep_min = (df['Dep_Hour'] * 60 + df['Dep_Minute']).to_numpy(dtype=float)
+                run_min = df['Duration_Min'].to_numpy(dtype=float)
+            else:
+                df['Dep_Hour'] = pd.to_numeric(df['Scheduled_Departure'].str.split(':').str[0], errors='coerce').fillna(8).astype(int)
+                dep_min = None
             is_today = (date_str == now.strftime("%Y-%m-%d"))
             live_traffic = self._get_traffic(now.hour, weather['is_rainy'], event_flag) if is_today else None
             
             traffic_lut = {h: (live_traffic if (is_today and h == now.hour) else self._get_traffic(h, weather['is_rainy'], event_flag)) for h in range(24)}
             df['Traffic_Density'] = df['Dep_Hour'].map(traffic_lut)
             
-            def calc_load_safe(row):
-                h = row['Dep_Hour']
-                base = 85 if (8<=h<=11 or 17<=h<=20) else 40
-                if event_flag: base += 20
-                seed = int(hashlib.md5(str(row.get('Service_ID')).encode()).hexdigest(), 16)
-                return max(0, min(100, base + (seed % 25 - 10)))
-            
-            df['Passenger_Load'] = df.apply(calc_load_safe, axis=1)
+            # Passenger load: peak/event base plus a stable per-service offset
+            hours = df['Dep_Hour'].to_numpy()
+            is_peak = ((hours >= 8) & (hours <= 11)) | ((hours >= 17) & (hours <= 20))
+            service_ids = df['Service_ID'].tolist() if 'Service_ID' in df.columns else [None] * len(df)
+            offsets = np.fromiter((_stable_seed(str(sid)) % 25 - 10 for sid in service_ids), dtype=np.int64, count=len(df))
+            df['Passenger_Load'] = _passenger_load(hours.astype(np.int64), offsets, bool(event_flag))
+            noise = np.fromiter((_service_noise(sid, date_str) for sid in service_ids), dtype=np.int64, count=len(df))
 
             # 5. ML INFERENCE
             if self.model:
@@ -416,7 +524,7 @@ class TransportEngine:
                         'To_Location': df['To_Location'],
                         'Weather': [weather['description']] * len(df),
                         'Is_Holiday': [1 if is_holiday else 0] * len(df),
-                        'Is_Peak_Hour': df['Dep_Hour'].apply(lambda h: 1 if (8<=h<=11 or 17<=h<=20) else 0),
+                        'Is_Peak_Hour': is_peak.astype(int),
                         'Event_Scheduled': [1 if event_flag else 0] * len(df),
                         'Traffic_Density': df['Traffic_Density'],
                         'Temperature_C': [weather['temp']] * len(df),
@@ -444,38 +552,43 @@ class TransportEngine:
                     pred_df = pred_df.apply(pd.to_numeric, errors='coerce').fillna(0)
                     
                     # The actual prediction
-                    base_delays = self.model.predict(pred_df)
-                    df['Delay'] = [self._apply_deterministic_noise(d, final_results[i].get('Service_ID'), date_str) for i, d in enumerate(base_delays)]
+                    base_delays = self.model.predict(pred_df).astype(int)
                 except Exception as e_inner:
-                    print(f"⚠️ ML Prediction Error: {e_inner}")
-                    df['Delay'] = df.apply(lambda row: self._apply_deterministic_noise(int(row['Passenger_Load']/4), row.get('Service_ID'), date_str), axis=1)
+                    logger.warning("⚠️ ML Prediction Error: %s", e_inner)
+                    base_delays = (df['Passenger_Load'].to_numpy() / 4).astype(int)
             else:
-                df['Delay'] = df.apply(lambda row: self._apply_deterministic_noise(5, row.get('Service_ID'), date_str), axis=1)
-
-            # 6. Update predictions in final_results
-            for i, row in df.iterrows():
-                delay = int(row['Delay'])
-                p = final_results[i]['prediction']
+                base_delays = np.full(len(df), 5)
+            delays, tiers = _delay_tiers(base_delays.astype(np.int64), noise)
+
+            # 6. Arrival Sync on minute-of-day columns (unparseable arrivals fall back to a 30 min run)
+            if dep_min is None:
+                dep_min = _hhmm_minutes(df['Scheduled_Departure'])
+                run_min = (_hhmm_minutes(df.get('Scheduled_Arrival', pd.Series([None] * len(df))), errors='coerce') - dep_min) % 1440
+            end_min = dep_min + np.nan_to_num(run_min, nan=30.0) + delays
+            if is_today:
+                now_min = now.hour * 60 + now.minute + (now.second + now.microsecond / 1e6) / 60
+                live = (dep_min <= now_min) & (now_min <= end_min)
+            else:
+                live = np.zeros(len(df), dtype=bool)
+            arrival = [format_hm(m) for m in end_min.astype(int).tolist()]
+
+            # 7. Update predictions in final_results
+            for s_copy, delay, tier, traffic, load, p_arrival, is_live in zip(
+                    final_results, delays.tolist(), tiers.tolist(), df['Traffic_Density'].tolist(),
+                    df['Passenger_Load'].tolist(), arrival, live.tolist()):
+                p = s_copy['prediction']
                 p['predicted_delay'] = delay
-                p['status_text'] = "ON TIME" if delay <= 10 else ("MINOR DELAY" if delay <= 20 else "MAJOR DELAY")
-                p['risk_level'] = "Low" if delay <= 10 else ("Medium" if delay <= 20 else "High")
+                p['status_text'] = STATUS_LABELS[tier]
+                p['risk_level'] = RISK_LABELS[tier]
                 p['weather'] = weather
-                p['traffic'] = row['Traffic_Density']
-                p['load'] = row['Passenger_Load']
-                p['reason'] = self._get_reason(delay, weather, row['Traffic_Density'], event_flag, final_results[i].get('Transport_Type'))
-                
-                # Arrival Sync
-                base_dt = datetime.strptime(f"{date_str} {final_results[i]['Scheduled_Departure']}", "%Y-%m-%d %H:%M")
-                try:
-                    arr_dt = datetime.strptime(f"{date_str} {final_results[i]['Scheduled_Arrival']}", "%Y-%m-%d %H:%M")
-                    dur = int((arr_dt - base_dt).total_seconds() / 60)
-                except: dur = 30
-                
-                p['predicted_arrival'] = (base_dt + timedelta(minutes=dur + delay)).strftime("%H:%M")
-                p['is_live'] = is_today and (base_dt <= now <= base_dt + timedelta(minutes=dur + delay))
+                p['traffic'] = traffic
+                p['load'] = load
+                p['reason'] = self._get_reason(delay, weather, traffic, event_flag, s_copy.get('Transport_Type'), now.hour)
+                p['predicted_arrival'] = p_arrival
+                p['is_live'] = is_live
 
         except Exception as e_outer:
-            print(f"❌ Batch Processing Catastrophe: {e_outer}")
+            logger.error("❌ Batch Processing Catastrophe: %s", e_outer)
             # Even here, we return the initialized final_results with heuristic defaults
             return final_results
 
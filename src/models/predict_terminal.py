@@ -59,16 +59,13 @@ def run_interactive():
     # Query Database
     if t_type == 'All':
         # Fetch for all common modes
-        dfs = []
+        schedules = []
         for m in ['Bus', 'Metro', 'Train']:
-            df = db.get_schedules_by_route(origin, dest, m, mapped_date)
-            if not df.empty:
-                dfs.append(df)
-        schedules_df = pd.concat(dfs) if dfs else pd.DataFrame()
+            schedules.extend(db.get_schedules_by_route(origin, dest, m, mapped_date))
     else:
-        schedules_df = db.get_schedules_by_route(origin, dest, t_type, mapped_date)
+        schedules = db.get_schedules_by_route(origin, dest, t_type, mapped_date)
     
-    if schedules_df.empty:
+    if not schedules:
         print(f"\n❌ No matching {t_type} services found for {origin} -> {dest} on {date_str}.")
         # Show some available locations to help the user
         try:
@@ -79,12 +76,11 @@ def run_interactive():
             pass
         return
 
-    print(f"🧠 Status: Running ML Inference on {len(schedules_df)} threads...", flush=True)
+    print(f"🧠 Status: Running ML Inference on {len(schedules)} threads...", flush=True)
 
     # Process Batch logic
     try:
-        schedules_raw = schedules_df.to_dict('records')
-        processed_schedules = ENGINE.process_batch(schedules_raw, date_str)
+        processed_schedules = ENGINE.process_batch(schedules, date_str)
     except Exception as e:
         print(f"❌ AI Engine Error: {e}")
         return
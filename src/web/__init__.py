@@ -0,0 +1,9 @@
+"""
+Web module
+
+Build-once static asset handling for the Flask app.
+"""
+
+from .assets import minify_css, inline_css_vars, extract_critical_css, compress_variants, build_stylesheet
+
+__all__ = ['minify_css', 'inline_css_vars', 'extract_critical_css', 'compress_variants', 'build_stylesheet']
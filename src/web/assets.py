@@ -0,0 +1,127 @@
+import re
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional: gzip is always available from the standard library
+    brotli = None
+
+# Quoted strings are lifted out before minifying so their contents are never rewritten
+_STRING_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_SPACE_RE = re.compile(r'\s+')
+_PUNCT_RE = re.compile(r'\s*([{};,>])\s*')
+_COLON_RE = re.compile(r':\s+')
+_LAST_SEMI_RE = re.compile(r';}')
+_HEX6_RE = re.compile(r'#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3(?![0-9a-fA-F])')
+_LEADING_ZERO_RE = re.compile(r'(?<![\w.])0\.(\d)')
+
+def minify_css(css):
+    """
+    Conservative CSS minifier: strips comments and redundant whitespace, drops the last `;`
+    of each block, shortens #aabbcc to #abc and 0.5 to .5. Quoted strings are left untouched.
+    """
+    strings = []
+
+    def _stash(match):
+        strings.append(match.group(0))
+        return f"\x00{len(strings) - 1}\x00"
+
+    css = _COMMENT_RE.sub('', css)
+    css = _STRING_RE.sub(_stash, css)
+    css = _SPACE_RE.sub(' ', css)
+    css = _PUNCT_RE.sub(r'\1', css)
+    css = _COLON_RE.sub(':', css)
+    css = _LAST_SEMI_RE.sub('}', css)
+    css = _HEX6_RE.sub(r'#\1\2\3', css)
+    css = _LEADING_ZERO_RE.sub(r'.\1', css)
+    css = re.sub(r'\x00(\d+)\x00', lambda m: strings[int(m.group(1))], css)
+    return css.strip()
+
+_ROOT_RE = re.compile(r':root\{([^}]*)\}')
+_CUSTOM_PROP_RE = re.compile(r'(--[\w-]+):([^;}]+)')
+_VAR_RE = re.compile(r'var\((--[\w-]+)\)')
+
+def inline_css_vars(css):
+    """
+    Replace var(--x) with the literal value declared in :root, so repeated rules skip
+    custom-property resolution during style recalc. Properties redeclared anywhere else are
+    runtime-themeable and stay as var(). :root itself is kept for inline styles in templates.
+    """
+    root = _ROOT_RE.search(css)
+    if not root:
+        return css
+    values = dict(_CUSTOM_PROP_RE.findall(root.group(1)))
+    head, tail = css[:root.start()], css[root.end():]
+    for name, _ in _CUSTOM_PROP_RE.findall(head + tail):
+        values.pop(name, None)
+
+    def _resolve(match):
+        return values.get(match.group(1), match.group(0))
+
+    # Resolve values that reference other custom properties until nothing changes
+    changed = True
+    while changed:
+        changed = False
+        for name, value in values.items():
+            resolved = _VAR_RE.sub(_resolve, value)
+            if resolved != value:
+                values[name], changed = resolved, True
+    return _VAR_RE.sub(_resolve, head) + root.group(0) + _VAR_RE.sub(_resolve, tail)
+
+# Rules for the header, hero, search form and glass cards: enough to paint the first screen
+CRITICAL_SELECTORS = (
+    ':root', '*', 'body', '.container', 'header', '.nav-brand', '.brand-icon', '.brand-text',
+    '.main-nav', '.nav-link', '.hero', '.glass-card', '.form-grid', '.input-group', '.input-label',
+    '.input-field', '.btn-primary', '.sensor-bar', '.sensor-chip',
+)
+
+def _top_level_rules(css):
+    """Split minified CSS into its top-level blocks (plain rules, @media, @keyframes, ...)"""
+    depth, start = 0, 0
+    for pos, ch in enumerate(css):
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                yield css[start:pos + 1]
+                start = pos + 1
+
+def _is_critical(selector, prefixes):
+    return any(selector == p or (selector.startswith(p) and not (selector[len(p)].isalnum() or selector[len(p)] in '-_'))
+               for p in prefixes)
+
+def extract_critical_css(css, prefixes=CRITICAL_SELECTORS):
+    """Top-level rules whose every selector targets an above-the-fold component, for inlining in <head>"""
+    critical = []
+    for rule in _top_level_rules(css):
+        if rule.startswith('@'):
+            continue
+        selectors = rule[:rule.index('{')].split(',')
+        if all(_is_critical(sel.strip(), prefixes) for sel in selectors):
+            critical.append(rule)
+    return ''.join(critical)
+
+def compress_variants(body):
+    """Content-Encoding -> pre-compressed bytes at maximum ratio (paid once, not per request)"""
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return variants
+
+def build_stylesheet(path):
+    """
+    Read, minify, inline custom properties and pre-compress a stylesheet once.
+    Returns the encoded bodies, a short content hash and the critical above-the-fold subset.
+    """
+    with open(path, encoding='utf-8') as f:
+        css = inline_css_vars(minify_css(f.read()))
+    body = css.encode('utf-8')
+    return {
+        "variants": compress_variants(body),
+        "version": hashlib.md5(body).hexdigest()[:12],
+        "critical": extract_critical_css(css),
+    }
@@ -0,0 +1,14 @@
+"""
+WSGI entry point for production servers.
+
+Gunicorn is started with --preload (see Procfile) so the prediction engine and
+its model artifacts are loaded once in the master and shared copy-on-write by
+the forked workers:
+
+    gunicorn --workers 4 --threads 2 --preload --timeout 60 wsgi:app
+"""
+
+from app import app
+
+if __name__ == "__main__":
+    app.run()